@@ -1,207 +1,291 @@
 import os
+import re
+import json
 import asyncio
+import hashlib
+from typing import Callable, List, TypeVar
+from urllib.parse import unquote
 
+import html2text
+import trafilatura
+from lxml import html as lxml_html
 from google import genai
+from google.genai import errors as genai_errors
 from google.genai import types as genai_types
+from pydantic import BaseModel
 
-client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
+from api.src.llm_cache import LLMCache
+from api.src.utils.executor import run_cpu_bound
+from api.src.utils.logger import LoggerFactory
 
+logger = LoggerFactory.get_service_logger()
+
+T = TypeVar("T")
+
+MODEL = "gemini-2.5-flash"
+
+# Created and closed by the application lifespan handler in main.py
+client: genai.Client | None = None
+llm_cache = LLMCache.from_env()
+
+# Bounds in-flight Gemini calls across all requests so bursts stay within quota
+_GEMINI_SEM = asyncio.Semaphore(int(os.environ.get("GEMINI_MAX_CONCURRENCY", "10")))
+_GEMINI_MAX_RETRIES = 3
+_GEMINI_INITIAL_BACKOFF_SECONDS = 1.0
+
+# Upper bound on the model call (including retries) for a single request
+PROFILE_EXTRACTION_TIMEOUT_SECONDS = float(
+    os.environ.get("PROFILE_EXTRACTION_TIMEOUT_SECONDS", "30")
+)
+
+_EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+_HEADING_RE = re.compile(r"^(?=#{1,6}\s)", re.MULTILINE)
+
+UNIFIED_PROMPT = """You are a company profile extractor. Extract the following fields from the input markdown content:
+company_name: a SINGLE company name, without any additional information or context.
+service_lines: the service lines of the company being described.
+company_description: a company description paragraph.
+tier1_keywords: keywords that this company would DEFINITELY use to search for public government opportunities
+(e.g., 'solar' would be a good keyword for a company that sells solar panels).
+tier2_keywords: keywords that this company MIGHT use to search for public government opportunities,
+but these keywords should be different than the tier1_keywords.
+point_of_contact: the points of contact, usually people names, emails or phone numbers.
+If a field cannot be determined, return 'Unknown' for it."""
+
+
+class CompanyProfileSchema(BaseModel):
+    company_name: str
+    service_lines: List[str]
+    company_description: str
+    tier1_keywords: List[str]
+    tier2_keywords: List[str]
+    point_of_contact: List[str]
+
+
+# Built once at import instead of on every call
+_CFG_COMPANY_PROFILE = genai_types.GenerateContentConfig(
+    system_instruction=UNIFIED_PROMPT,
+    response_mime_type="application/json",
+    response_schema=CompanyProfileSchema,
+)
+
+
+def init_client() -> genai.Client:
+    global client
+    if client is None:
+        client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
+    return client
 
-# Helper function to run the async get_company_profile in sync contexts
-def get_company_profile_sync(website_content) -> dict:
-    """
-    Synchronous wrapper for the async get_company_profile function.
-    Use this when calling from synchronous code.
-    """
-    return asyncio.run(get_company_profile(website_content))
+
+async def close_client() -> None:
+    global client
+    if client is not None:
+        closing_client, client = client, None
+        await closing_client.aio.aclose()
 
 
 async def get_company_profile(website_content) -> dict:
     try:
-        markdown_content = await convert_html_to_markdown(website_content)
-
-        if markdown_content is None:
-            return {
-                "company_name": "Unknown",
-                "service_lines": "Unknown",
-                "company_description": "Unknown",
-                "tier1_keywords": "Unknown",
-                "tier2_keywords": "Unknown",
-                "emails": "Unknown",
-                "point_of_contact": "Unknown",
-            }
-
-        tasks = [
-            extract_company_name_from_markdown(markdown_content),
-            extract_service_lines_from_markdown(markdown_content),
-            extract_company_description_from_markdown(markdown_content),
-            extract_tier1_keywords_from_markdown(markdown_content),
-            extract_emails_from_markdown(markdown_content),
-            extract_point_of_contact_from_markdown(markdown_content),
-        ]
-
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        processed_results = []
-        for result in results:
-            if isinstance(result, Exception):
-                print(f"Error in extraction: {result}")
-                processed_results.append("Unknown")
-            else:
-                processed_results.append(result)
-
-        (
-            company_name,
-            service_lines,
-            company_description,
-            tier_1_keywords,
-            emails,
-            point_of_contact,
-        ) = processed_results
+        markdown_content = await run_cpu_bound(
+            convert_html_to_markdown, website_content
+        )
 
-        try:
-            tier_2_keywords = (
-                await extract_tier2_keywords_from_markdown_and_previous_tier_1_keywords(
-                    markdown_content, tier_1_keywords
-                )
+        # html2text renders an empty page as blank lines, which must not be
+        # sent to Gemini
+        if not markdown_content.strip():
+            return unknown_profile()
+
+        async with asyncio.timeout(PROFILE_EXTRACTION_TIMEOUT_SECONDS):
+            profile = await extract_company_profile_from_markdown(
+                _compress_markdown(markdown_content)
             )
-        except Exception as e:
-            print(f"Error extracting tier 2 keywords: {e}")
-            tier_2_keywords = "Unknown"
 
-        return {
-            "company_name": company_name,
-            "service_lines": service_lines.split(",")
-            if service_lines and service_lines != "Unknown"
-            else ["Unknown"],
-            "company_description": company_description,
-            "tier1_keywords": tier_1_keywords.split(",")
-            if tier_1_keywords and tier_1_keywords != "Unknown"
-            else ["Unknown"],
-            "tier2_keywords": tier_2_keywords.split(",")
-            if tier_2_keywords and tier_2_keywords != "Unknown"
-            else ["Unknown"],
-            "emails": emails.split(",")
-            if emails and emails != "Unknown"
-            else ["Unknown"],
-            "point_of_contact": point_of_contact.split(",")
-            if point_of_contact and point_of_contact != "Unknown"
-            else ["Unknown"],
-        }
+        if profile is None:
+            return unknown_profile()
+
+        # Emails often sit in footers and mailto links, which the main-content
+        # markdown drops, so scan the whole page instead.
+        try:
+            emails = await run_cpu_bound(extract_emails_from_html, website_content)
+        except Exception:
+            logger.exception("Error extracting emails")
+            emails = "Unknown"
 
-    except Exception as e:
-        print(f"Error in get_company_profile: {e}")
         return {
-            "company_name": "Unknown",
-            "service_lines": ["Unknown"],
-            "company_description": "Unknown",
-            "tier1_keywords": ["Unknown"],
-            "tier2_keywords": ["Unknown"],
-            "emails": ["Unknown"],
-            "point_of_contact": ["Unknown"],
+            "company_name": profile.company_name or "Unknown",
+            "service_lines": profile.service_lines or ["Unknown"],
+            "company_description": profile.company_description or "Unknown",
+            "tier1_keywords": profile.tier1_keywords or ["Unknown"],
+            "tier2_keywords": profile.tier2_keywords or ["Unknown"],
+            "emails": emails.split(",") if emails != "Unknown" else ["Unknown"],
+            "point_of_contact": profile.point_of_contact or ["Unknown"],
         }
 
+    except Exception:
+        logger.exception("Error in get_company_profile")
+        return unknown_profile()
 
-async def convert_html_to_markdown(html_content: str) -> str | None:
-    response = await client.aio.models.generate_content(
-        model="gemini-2.5-flash",
-        config=genai_types.GenerateContentConfig(
-            system_instruction="You are a HTML to Markdown converter. Convert the input HTML to markdown format."
-        ),
-        contents=html_content,
-    )
-    return response.text
 
+def unknown_profile() -> dict:
+    return {
+        "company_name": "Unknown",
+        "service_lines": ["Unknown"],
+        "company_description": "Unknown",
+        "tier1_keywords": ["Unknown"],
+        "tier2_keywords": ["Unknown"],
+        "emails": ["Unknown"],
+        "point_of_contact": ["Unknown"],
+    }
 
-async def extract_company_name_from_markdown(markdown_content: str) -> str:
-    response = await client.aio.models.generate_content(
-        model="gemini-2.5-flash",
-        config=genai_types.GenerateContentConfig(
-            system_instruction="You are a company name extractor. Extract a SINGLE company name from the provided markdown content. There should be no other text in the response. Do not include any additional information or context."
-        ),
-        contents=markdown_content,
-    )
-    return response.text if response.text else "Unknown"
 
+def _compress_markdown(markdown_content: str, max_chars: int = 20000) -> str:
+    """
+    Shrink markdown before it is sent to Gemini: drop repeated paragraphs
+    (navigation, footers) and keep the earliest sections up to max_chars,
+    since identity and contact details are usually near the top of a page.
+    """
+    seen_paragraphs = set()
+    sections = []
+    size = 0
 
-async def extract_service_lines_from_markdown(markdown_content: str) -> str:
-    response = await client.aio.models.generate_content(
-        model="gemini-2.5-flash",
-        config=genai_types.GenerateContentConfig(
-            system_instruction="You are a service line generator. Enumerate service lines for the company being described in the input content. Return a list of service lines separated by comma. There should be no other text in the response."
-        ),
-        contents=markdown_content,
-    )
-    return response.text if response.text else "Unknown"
+    for section in _HEADING_RE.split(markdown_content):
+        paragraphs = []
+        for paragraph in section.split("\n\n"):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            digest = hashlib.md5(paragraph.encode("utf-8")).digest()
+            if digest in seen_paragraphs:
+                continue
+            seen_paragraphs.add(digest)
+            paragraphs.append(paragraph)
 
+        if not paragraphs:
+            continue
 
-async def extract_company_description_from_markdown(markdown_content: str) -> str:
-    response = await client.aio.models.generate_content(
-        model="gemini-2.5-flash",
-        config=genai_types.GenerateContentConfig(
-            system_instruction="""You are a company description generator. 
-            Generate a company description paragraph based on the input content. 
-            There should be no other text in the response."""
-        ),
-        contents=markdown_content,
-    )
-    return response.text if response.text else "Unknown"
-
-
-async def extract_tier1_keywords_from_markdown(markdown_content: str) -> str:
-    response = await client.aio.models.generate_content(
-        model="gemini-2.5-flash",
-        config=genai_types.GenerateContentConfig(
-            system_instruction="""You are a company keywords generator. 
-            Enumerate keywords that this company would DEFINITELY use to search for public government opportunities
-            (e.g., 'solar' would be a good keyword for a company that sells solar panels). 
-            Return a list of keywords separated by comma. There should be no other text in the response."""
-        ),
-        contents=markdown_content,
-    )
-    return response.text if response.text else "Unknown"
-
-
-async def extract_tier2_keywords_from_markdown_and_previous_tier_1_keywords(
-    markdown_content: str, tier_1_keywords: str
-) -> str:
-    response = await client.aio.models.generate_content(
-        model="gemini-2.5-flash",
-        config=genai_types.GenerateContentConfig(
-            system_instruction=f"""You are a company keywords generator. 
-            Enumerate keywords that this company MIGHT use to search for public government opportunities, 
-            but these keywords should be different than the tier 1 keywords provided: tier 1 keywords: {tier_1_keywords}. 
-            Return a list of keywords separated by comma. 
-            There should be no other text in the response."""
-        ),
-        contents=markdown_content,
+        section_text = "\n\n".join(paragraphs)
+        separator_size = 2 if sections else 0
+        remaining = max_chars - size - separator_size
+        if len(section_text) > remaining:
+            if remaining > 0:
+                sections.append(section_text[:remaining])
+            break
+        sections.append(section_text)
+        size += separator_size + len(section_text)
+
+    return "\n\n".join(sections)
+
+
+async def cached_generate(
+    config: genai_types.GenerateContentConfig,
+    contents: str,
+    parse: Callable[[str], T],
+    model: str = MODEL,
+) -> T | None:
+    """
+    Generate content with Gemini and parse it, reusing a cached response for
+    identical (model, config, contents) inputs. Only responses that parse
+    successfully are cached, so a truncated or malformed answer is retried on
+    the next call instead of being served from the cache.
+    """
+    key = LLMCache.make_key(model, _config_cache_id(config), contents)
+    cached_text = await llm_cache.get(key)
+    if cached_text is not None:
+        return parse(cached_text)
+
+    response_text = await _generate_with_backoff(model, config, contents)
+    if not response_text:
+        return None
+
+    parsed = parse(response_text)
+    await llm_cache.set(key, response_text)
+    return parsed
+
+
+def _config_cache_id(config: genai_types.GenerateContentConfig) -> str:
+    """Describe the parts of a config that change the response, for cache keys."""
+    schema = config.response_schema
+    if isinstance(schema, type) and issubclass(schema, BaseModel):
+        schema_id = json.dumps(schema.model_json_schema(), sort_keys=True)
+    else:
+        schema_id = repr(schema)
+    return f"{config.system_instruction}{config.response_mime_type or ''}{schema_id}"
+
+
+async def _generate_with_backoff(
+    model: str, config: genai_types.GenerateContentConfig, contents: str
+) -> str | None:
+    """
+    Stream a Gemini response under the global concurrency limit, retrying
+    rate-limited (HTTP 429) calls with exponential backoff.
+    """
+    backoff = _GEMINI_INITIAL_BACKOFF_SECONDS
+    for attempt in range(_GEMINI_MAX_RETRIES + 1):
+        try:
+            async with _GEMINI_SEM:
+                chunks = []
+                async for chunk in await init_client().aio.models.generate_content_stream(
+                    model=model,
+                    config=config,
+                    contents=contents,
+                ):
+                    if chunk.text:
+                        chunks.append(chunk.text)
+                return "".join(chunks) or None
+        except genai_errors.APIError as e:
+            if e.code != 429 or attempt == _GEMINI_MAX_RETRIES:
+                raise
+        await asyncio.sleep(backoff)
+        backoff *= 2
+
+
+def convert_html_to_markdown(html_content: str) -> str:
+    """
+    Convert HTML to markdown deterministically, keeping the main page content.
+    Falls back to a full-page html2text conversion when trafilatura cannot
+    identify any main content.
+    """
+    markdown_content = trafilatura.extract(
+        html_content, output_format="markdown", include_links=True
     )
-    return response.text if response.text else "Unknown"
+    if markdown_content:
+        return markdown_content
+    return html2text.HTML2Text().handle(html_content)
 
 
-async def extract_emails_from_markdown(markdown_content: str) -> str:
-    response = await client.aio.models.generate_content(
-        model="gemini-2.5-flash",
-        config=genai_types.GenerateContentConfig(
-            system_instruction="""You are an email extractor. Extract all emails from the input content. 
-            Return a list of emails separated by comma. 
-            There should be no other text in the response. If no emails are found, return 'Unknown'."""
-        ),
+async def extract_company_profile_from_markdown(
+    markdown_content: str,
+) -> CompanyProfileSchema | None:
+    return await cached_generate(
+        config=_CFG_COMPANY_PROFILE,
         contents=markdown_content,
+        parse=CompanyProfileSchema.model_validate_json,
     )
-    return response.text if response.text else "Unknown"
-
-
-async def extract_point_of_contact_from_markdown(markdown_content: str) -> str:
-    response = await client.aio.models.generate_content(
-        model="gemini-2.5-flash",
-        config=genai_types.GenerateContentConfig(
-            system_instruction="""You are a point of contact extractor. Extract the point of contact from the input markdown content. 
-            Point of contacts are usually people names, emails or phone numbers.
-            Return a list of point of contacts separated by comma.
-            There should be no other text in the response.
-            If uncertain, return 'Unknown'."""
-        ),
-        contents=markdown_content,
+
+
+def extract_emails_from_html(html_content: str) -> str:
+    """
+    Collect emails from the visible text and mailto links of a whole page.
+    Attribute values such as image URLs are skipped to avoid matches like
+    logo@2x.png.
+    """
+    if not html_content.strip():
+        return "Unknown"
+
+    # Parse bytes: lxml rejects str input that carries an XML encoding
+    # declaration, which XHTML pages start with
+    document = lxml_html.fromstring(
+        html_content.encode("utf-8"),
+        parser=lxml_html.HTMLParser(encoding="utf-8"),
     )
-    return response.text if response.text else "Unknown"
+    texts = list(document.itertext())
+    texts += [
+        unquote(href[len("mailto:"):].split("?", 1)[0])
+        for href in document.xpath("//a/@href")
+        if href.lower().startswith("mailto:")
+    ]
+
+    emails = set()
+    for text in texts:
+        emails.update(_EMAIL_RE.findall(text))
+    return ",".join(sorted(emails)) or "Unknown"
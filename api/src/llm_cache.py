@@ -0,0 +1,76 @@
+"""
+LLM Cache Module
+
+This module provides an in-memory response cache for LLM calls. Entries are keyed
+by a SHA-256 hash of the model, system instruction and content, and expire after
+a configurable time to live.
+"""
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class LLMCache:
+    """
+    Exact-match cache for LLM text responses with TTL expiry and LRU eviction.
+    """
+
+    def __init__(self, ttl_seconds: int = 24 * 60 * 60, max_entries: int = 1024):
+        """
+        Args:
+            ttl_seconds: How long a cached response stays valid
+            max_entries: Maximum number of responses to keep before evicting
+                the least recently used one
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(model: str, system_instruction: str, contents: str) -> str:
+        """Build the cache key for a model call."""
+        return hashlib.sha256(
+            (model + system_instruction + contents).encode("utf-8")
+        ).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        """Store a response under key."""
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def clear(self) -> None:
+        """Drop every cached response."""
+        self._entries.clear()
+
+    @classmethod
+    def from_env(cls) -> "LLMCache":
+        """
+        Create a cache configured from environment variables.
+
+        Environment variables:
+        - LLM_CACHE_TTL_SECONDS: Time to live of cached responses (default 24h)
+        - LLM_CACHE_MAX_ENTRIES: Maximum number of cached responses (default 1024)
+        """
+        return cls(
+            ttl_seconds=int(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 60 * 60))),
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024")),
+        )
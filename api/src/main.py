@@ -1,7 +1,8 @@
+from contextlib import AsyncExitStack, asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 import uvicorn
 import os
 import sys
@@ -10,12 +11,31 @@ import pathlib
 sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent.parent))
 
 from api.src.presentation import router as presentation_router
+from api.src import ai_analyzer, service
+from api.src.utils import executor
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared clients on startup and release them on shutdown"""
+    # The exit stack runs every teardown step even if an earlier one fails
+    async with AsyncExitStack() as stack:
+        ai_analyzer.init_client()
+        stack.push_async_callback(ai_analyzer.close_client)
+        executor.init_process_pool()
+        stack.callback(executor.shutdown_process_pool)
+        service.init_http_client()
+        stack.push_async_callback(service.close_http_client)
+        yield
+
 
 # Create FastAPI instance
 app = FastAPI(
     title="Company Profile Generator API",
     description="API for analyzing company websites and generating business profiles",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # CORS middleware for frontend integration
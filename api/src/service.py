@@ -1,16 +1,233 @@
-import requests
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import urlsplit
 
-from api.src.ai_analyzer import get_company_profile
+import httpx
+from bs4 import BeautifulSoup, Comment
+
+from api.src.ai_analyzer import get_company_profile, unknown_profile
+from api.src.utils.executor import run_cpu_bound
+
+# Shared client so TCP/TLS connections are pooled across requests. It is created
+# and closed by the application lifespan handler in main.py.
+_client: Optional[httpx.AsyncClient] = None
+
+
+PROFILE_CACHE_TTL_SECONDS = int(os.environ.get("PROFILE_CACHE_TTL_SECONDS", "3600"))
+PROFILE_CACHE_MAX_ENTRIES = int(os.environ.get("PROFILE_CACHE_MAX_ENTRIES", "1024"))
+
+# Pages are truncated to this many bytes before decoding
+MAX_HTML_BYTES = 2 * 1024 * 1024
+
+# Per-host politeness: cap concurrent fetches to one host and space out their
+# start times so bursts of requests for the same site do not get us throttled
+HOST_MAX_CONCURRENCY = int(os.environ.get("HOST_MAX_CONCURRENCY", "6"))
+HOST_MIN_INTERVAL_SECONDS = float(os.environ.get("HOST_MIN_INTERVAL_SECONDS", "0.1"))
+
+
+@dataclass
+class _HostState:
+    semaphore: asyncio.Semaphore
+    next_request_at: float = 0.0
+    active_fetches: int = 0
+
+
+# Only hosts with a fetch in progress or a start slot still pending are kept;
+# idle hosts are pruned so arbitrary user-supplied URLs do not accumulate
+_hosts: Dict[str, _HostState] = {}
+
+
+@dataclass
+class _CachedProfile:
+    profile: dict
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expires_at: float
+
+
+# Company profiles by website URL. Expired entries are kept (up to the size
+# limit) so they can be revalidated with a conditional request.
+_profile_cache: "OrderedDict[str, _CachedProfile]" = OrderedDict()
+
+# Analyses currently running, by website URL, so concurrent requests for the
+# same site share one fetch and one model call
+_inflight: Dict[str, "asyncio.Task[dict]"] = {}
 
 
 async def analyze_website(website_url):
-    html_content = await fetch_html_content(str(website_url))
+    url = str(website_url)
+    task = _inflight.get(url)
+    if task is None:
+        task = asyncio.ensure_future(_analyze_website(url))
+        _inflight[url] = task
+        task.add_done_callback(lambda done: _forget_inflight(url, done))
+
+    # Shield the shared task so one caller disconnecting does not cancel it
+    # for the others
+    return await asyncio.shield(task)
+
+
+def _forget_inflight(url, task):
+    if _inflight.get(url) is task:
+        del _inflight[url]
+
+
+async def _analyze_website(url):
+    cached = _profile_cache.get(url)
+    if cached is not None and cached.expires_at > time.monotonic():
+        return cached.profile
+
+    headers = {}
+    if cached is not None:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+
+    response, html_content = await fetch_website(url, headers)
+    if response.status_code == 304 and cached is not None:
+        # Servers may send fresh validators with a 304
+        cached.etag = response.headers.get("ETag", cached.etag)
+        cached.last_modified = response.headers.get(
+            "Last-Modified", cached.last_modified
+        )
+        cached.expires_at = time.monotonic() + PROFILE_CACHE_TTL_SECONDS
+        # Other requests may have evicted the entry while we were fetching
+        _profile_cache[url] = cached
+        _profile_cache.move_to_end(url)
+        _evict_oldest_profiles()
+        return cached.profile
+
+    # Non-HTML responses come back empty; there is nothing to analyze
+    if not html_content.strip():
+        return unknown_profile()
+
+    html_content = await run_cpu_bound(_clean_html, html_content)
     company_profile = await get_company_profile(html_content)
+    if company_profile["company_name"] != "Unknown":
+        _cache_profile(url, company_profile, response)
     return company_profile
 
 
-async def fetch_html_content(url):
-    response = requests.get(url)
-    response.raise_for_status()
-    html_content = response.text
-    return html_content
+async def fetch_website(url, headers=None):
+    """
+    Fetch a page, reading at most MAX_HTML_BYTES of its body. Returns the
+    response and its decoded HTML, which is empty for non-HTML content and
+    for 304 Not Modified answers to conditional requests.
+    """
+    host = urlsplit(url).hostname or ""
+    host_state = _acquire_host(host)
+    try:
+        async with host_state.semaphore:
+            await _wait_for_host_turn(host_state)
+
+            http_client = init_http_client()
+            request = http_client.build_request("GET", url, headers=headers)
+            response = await http_client.send(request, stream=True)
+            try:
+                # httpx treats 304 as an error status; for us it means the cached
+                # profile is still valid
+                if response.status_code == 304:
+                    return response, ""
+                response.raise_for_status()
+
+                content_type = response.headers.get("Content-Type", "")
+                if content_type and "html" not in content_type:
+                    return response, ""
+
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body.extend(chunk)
+                    if len(body) >= MAX_HTML_BYTES:
+                        break
+            finally:
+                await response.aclose()
+    finally:
+        host_state.active_fetches -= 1
+
+    html_content = bytes(body[:MAX_HTML_BYTES]).decode(
+        response.encoding or "utf-8", errors="replace"
+    )
+    return response, html_content
+
+
+def _acquire_host(host):
+    """Return the politeness state for host, registering a fetch in progress"""
+    now = time.monotonic()
+    for idle_host in [
+        name
+        for name, state in _hosts.items()
+        if state.active_fetches == 0 and state.next_request_at <= now
+    ]:
+        del _hosts[idle_host]
+
+    host_state = _hosts.get(host)
+    if host_state is None:
+        host_state = _hosts[host] = _HostState(
+            semaphore=asyncio.Semaphore(HOST_MAX_CONCURRENCY)
+        )
+    host_state.active_fetches += 1
+    return host_state
+
+
+async def _wait_for_host_turn(host_state):
+    """Sleep until at least HOST_MIN_INTERVAL_SECONDS since the last fetch start to the host"""
+    now = time.monotonic()
+    start_at = max(now, host_state.next_request_at)
+    host_state.next_request_at = start_at + HOST_MIN_INTERVAL_SECONDS
+    if start_at > now:
+        await asyncio.sleep(start_at - now)
+
+
+def _cache_profile(url, company_profile, response):
+    _profile_cache[url] = _CachedProfile(
+        profile=company_profile,
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+        expires_at=time.monotonic() + PROFILE_CACHE_TTL_SECONDS,
+    )
+    _profile_cache.move_to_end(url)
+    _evict_oldest_profiles()
+
+
+def _evict_oldest_profiles():
+    while len(_profile_cache) > PROFILE_CACHE_MAX_ENTRIES:
+        _profile_cache.popitem(last=False)
+
+
+def _clean_html(html_content):
+    """Remove non-visible markup (scripts, styles, SVGs, comments) from a page"""
+    soup = BeautifulSoup(html_content, "lxml")
+    for tag in soup(["script", "style", "noscript", "svg", "iframe"]):
+        tag.decompose()
+    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
+    return str(soup)
+
+
+def init_http_client():
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                # Retry failed connection attempts (refused, reset, DNS) on the pool
+                retries=2,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            ),
+            # Fail fast on unreachable hosts while giving slow pages time to respond
+            timeout=httpx.Timeout(30.0, connect=5.0, read=15.0),
+            follow_redirects=True,
+        )
+    return _client
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        closing_client, _client = _client, None
+        await closing_client.aclose()
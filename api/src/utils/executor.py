@@ -0,0 +1,59 @@
+"""
+Executor Module
+
+This module runs CPU-bound work (HTML parsing and conversion) off the event loop.
+Regular pages go to a worker thread; very large pages go to a process pool that is
+shared across the application and managed by the lifespan handler in main.py.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Inputs larger than this are sent to the process pool to bypass the GIL
+LARGE_INPUT_CHARS = 1024 * 1024
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def init_process_pool() -> ProcessPoolExecutor:
+    """Create the shared process pool if it does not exist yet."""
+    global _process_pool
+    if _process_pool is None:
+        # Spawn workers instead of forking: by now the process has logging,
+        # to_thread and HTTP client threads whose locks a forked child could
+        # inherit in a held state
+        _process_pool = ProcessPoolExecutor(
+            max_workers=int(os.getenv("CPU_POOL_MAX_WORKERS", str(os.cpu_count() or 1))),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """Shut down the shared process pool, cancelling queued work."""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+async def run_cpu_bound(func: Callable[[str], T], content: str) -> T:
+    """
+    Run func(content) without blocking the event loop.
+
+    Args:
+        func: Module-level function (it must be picklable for the process pool)
+        content: Text input, whose size decides between thread and process
+
+    Returns:
+        The function result
+    """
+    if _process_pool is not None and len(content) > LARGE_INPUT_CHARS:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_process_pool, func, content)
+    return await asyncio.to_thread(func, content)
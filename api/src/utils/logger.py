@@ -5,13 +5,15 @@ This module provides a centralized logging configuration factory for the applica
 It supports different log levels, formatters, and output destinations.
 """
 
+import atexit
 import logging
 import logging.handlers
 import os
+import queue
 import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from enum import Enum
 
 
@@ -32,6 +34,7 @@ class LoggerFactory:
     """
 
     _loggers: Dict[str, logging.Logger] = {}
+    _queue_listeners: List[logging.handlers.QueueListener] = []
     _default_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     _detailed_format = "%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(funcName)s() - %(message)s"
 
@@ -104,7 +107,18 @@ class LoggerFactory:
             )
             file_handler.setLevel(level.value)
             file_handler.setFormatter(formatter)
-            logger.addHandler(file_handler)
+
+            # Write to the file on a background thread so disk I/O stays off
+            # the request path
+            log_queue: queue.SimpleQueue = queue.SimpleQueue()
+            queue_handler = logging.handlers.QueueHandler(log_queue)
+            queue_handler.setLevel(level.value)
+            listener = logging.handlers.QueueListener(
+                log_queue, file_handler, respect_handler_level=True
+            )
+            listener.start()
+            cls._queue_listeners.append(listener)
+            logger.addHandler(queue_handler)
 
         # Prevent log messages from being handled by parent loggers
         logger.propagate = False
@@ -114,6 +128,12 @@ class LoggerFactory:
 
         return logger
 
+    @classmethod
+    def stop_queue_listeners(cls) -> None:
+        """Flush pending file log records and stop the background writer threads."""
+        while cls._queue_listeners:
+            cls._queue_listeners.pop().stop()
+
     @classmethod
     def _get_default_log_file_path(cls, logger_name: str) -> str:
         """
@@ -286,6 +306,9 @@ class LoggerFactory:
         logger.error(error_msg, exc_info=True)
 
 
+atexit.register(LoggerFactory.stop_queue_listeners)
+
+
 # Convenience functions for common use cases
 def get_logger(name: str, level: LogLevel = LogLevel.INFO) -> logging.Logger:
     """Convenience function to get a logger with default settings."""
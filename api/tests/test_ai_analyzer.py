@@ -0,0 +1,170 @@
+import asyncio
+
+import pytest
+from google.genai import types as genai_types
+from pydantic import BaseModel, ValidationError
+
+from api.src import ai_analyzer
+from api.src.llm_cache import LLMCache
+from api.src.ai_analyzer import (
+    CompanyProfileSchema,
+    _compress_markdown,
+    extract_emails_from_html,
+    unknown_profile,
+)
+
+
+def test_extract_emails_from_html_includes_footer_and_mailto_links():
+    html_content = (
+        "<html><body><main><h1>Acme</h1><p>We make widgets.</p></main>"
+        '<footer><a href="mailto:info@acme.com?subject=Hi">Contact us</a>'
+        " jane@acme.com</footer></body></html>"
+    )
+
+    assert extract_emails_from_html(html_content) == "info@acme.com,jane@acme.com"
+
+
+def test_extract_emails_from_html_ignores_attribute_values():
+    html_content = (
+        '<html><body><img src="logo@2x.png"><p>No contact here</p>'
+        "<p>sales@acme.com</p></body></html>"
+    )
+
+    assert extract_emails_from_html(html_content) == "sales@acme.com"
+
+
+def test_extract_emails_from_html_without_emails():
+    assert extract_emails_from_html("<p>Nothing</p>") == "Unknown"
+    assert extract_emails_from_html("") == "Unknown"
+
+
+def test_compress_markdown_stays_within_max_chars():
+    markdown_content = "# A\n" + "x" * 16 + "\n\n# B\n" + "y" * 100
+
+    compressed = _compress_markdown(markdown_content, max_chars=20)
+
+    assert compressed == "# A\n" + "x" * 16
+    assert len(compressed) <= 20
+
+
+def test_compress_markdown_truncates_the_section_that_overflows():
+    markdown_content = "# A\nabc\n\n# B\n" + "y" * 100
+
+    compressed = _compress_markdown(markdown_content, max_chars=20)
+
+    assert compressed == "# A\nabc\n\n# B\nyyyyyyy"
+    assert len(compressed) == 20
+
+
+def test_compress_markdown_drops_repeated_paragraphs():
+    markdown_content = "# A\n\nHome | About\n\n# B\n\nHome | About\n\nWidgets"
+
+    assert _compress_markdown(markdown_content) == (
+        "# A\n\nHome | About\n\n# B\n\nWidgets"
+    )
+
+
+def test_get_company_profile_skips_gemini_for_blank_pages(monkeypatch):
+    extracted = []
+
+    async def fake_extract(markdown_content):
+        extracted.append(markdown_content)
+        return None
+
+    monkeypatch.setattr(ai_analyzer, "extract_company_profile_from_markdown", fake_extract)
+
+    profile = asyncio.run(ai_analyzer.get_company_profile("<html><body></body></html>"))
+
+    assert profile == unknown_profile()
+    assert extracted == []
+
+
+XHTML_PAGE = (
+    '<?xml version="1.0" encoding="utf-8"?>\n'
+    '<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Strict//EN" '
+    '"http://www.w3.org/TR/xhtml1/DTD/xhtml1-strict.dtd">\n'
+    '<html xmlns="http://www.w3.org/1999/xhtml"><body>'
+    "<h1>Acme Café</h1><p>Acme makes widgets for public agencies.</p>"
+    '<footer><a href="mailto:info@acme.com">Contact</a></footer>'
+    "</body></html>"
+)
+
+ACME_PROFILE = CompanyProfileSchema(
+    company_name="Acme",
+    service_lines=["Widgets"],
+    company_description="Acme makes widgets.",
+    tier1_keywords=["widgets"],
+    tier2_keywords=["manufacturing"],
+    point_of_contact=["info@acme.com"],
+)
+
+
+def test_extract_emails_from_xhtml_with_xml_declaration():
+    assert extract_emails_from_html(XHTML_PAGE) == "info@acme.com"
+
+
+def test_get_company_profile_keeps_profile_for_xhtml_pages(monkeypatch):
+    async def fake_extract(markdown_content):
+        return ACME_PROFILE
+
+    monkeypatch.setattr(ai_analyzer, "extract_company_profile_from_markdown", fake_extract)
+
+    profile = asyncio.run(ai_analyzer.get_company_profile(XHTML_PAGE))
+
+    assert profile["company_name"] == "Acme"
+    assert profile["emails"] == ["info@acme.com"]
+
+
+def test_get_company_profile_keeps_profile_when_email_extraction_fails(monkeypatch):
+    async def fake_extract(markdown_content):
+        return ACME_PROFILE
+
+    def failing_extract_emails(html_content):
+        raise ValueError("unparseable page")
+
+    monkeypatch.setattr(ai_analyzer, "extract_company_profile_from_markdown", fake_extract)
+    monkeypatch.setattr(ai_analyzer, "extract_emails_from_html", failing_extract_emails)
+
+    profile = asyncio.run(ai_analyzer.get_company_profile(XHTML_PAGE))
+
+    assert profile["company_name"] == "Acme"
+    assert profile["emails"] == ["Unknown"]
+
+
+def test_invalid_model_responses_are_not_cached(monkeypatch):
+    responses = ['{"company_name": "Acme", "service_li', ACME_PROFILE.model_dump_json()]
+    generated = []
+
+    async def fake_generate(model, config, contents):
+        generated.append(contents)
+        return responses[len(generated) - 1]
+
+    monkeypatch.setattr(ai_analyzer, "llm_cache", LLMCache())
+    monkeypatch.setattr(ai_analyzer, "_generate_with_backoff", fake_generate)
+
+    async def extract_three_times():
+        with pytest.raises(ValidationError):
+            await ai_analyzer.extract_company_profile_from_markdown("# Acme")
+        second = await ai_analyzer.extract_company_profile_from_markdown("# Acme")
+        third = await ai_analyzer.extract_company_profile_from_markdown("# Acme")
+        return second, third
+
+    second, third = asyncio.run(extract_three_times())
+
+    assert second == third == ACME_PROFILE
+    assert len(generated) == 2
+
+
+def test_cache_key_depends_on_response_schema():
+    class OtherSchema(BaseModel):
+        company_name: str
+
+    other_config = genai_types.GenerateContentConfig(
+        system_instruction=ai_analyzer.UNIFIED_PROMPT,
+        response_mime_type="application/json",
+        response_schema=OtherSchema,
+    )
+
+    assert ai_analyzer._config_cache_id(other_config) != ai_analyzer._config_cache_id(
+        ai_analyzer._CFG_COMPANY_PROFILE
+    )
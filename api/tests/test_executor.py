@@ -0,0 +1,16 @@
+import asyncio
+
+from api.src.utils import executor
+
+
+def test_large_inputs_run_in_spawned_process_pool():
+    content = "x" * (executor.LARGE_INPUT_CHARS + 1)
+
+    pool = executor.init_process_pool()
+    try:
+        assert pool._mp_context.get_start_method() == "spawn"
+        assert asyncio.run(executor.run_cpu_bound(len, content)) == len(content)
+    finally:
+        executor.shutdown_process_pool()
+
+    assert executor._process_pool is None
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from api.src import ai_analyzer, main, service
+from api.src.utils import executor
+
+
+def test_lifespan_closes_clients(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+
+    async def run_lifespan():
+        async with main.lifespan(main.app):
+            assert ai_analyzer.client is not None
+            assert service._client is not None
+            assert executor._process_pool is not None
+
+    asyncio.run(run_lifespan())
+
+    assert ai_analyzer.client is None
+    assert service._client is None
+    assert executor._process_pool is None
+
+
+def test_lifespan_can_run_again_in_the_same_process(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    http_clients = []
+
+    async def run_lifespan():
+        async with main.lifespan(main.app):
+            http_clients.append(service._client)
+            assert not service._client.is_closed
+
+    asyncio.run(run_lifespan())
+    asyncio.run(run_lifespan())
+
+    assert http_clients[0] is not http_clients[1]
+
+
+def test_lifespan_teardown_continues_after_a_failure(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(ai_analyzer, "client", None)
+
+    async def failing_close_client():
+        raise RuntimeError("close failed")
+
+    monkeypatch.setattr(ai_analyzer, "close_client", failing_close_client)
+
+    async def run_lifespan():
+        async with main.lifespan(main.app):
+            pass
+
+    with pytest.raises(RuntimeError, match="close failed"):
+        asyncio.run(run_lifespan())
+
+    assert executor._process_pool is None
@@ -0,0 +1,142 @@
+import asyncio
+from collections import OrderedDict
+
+import httpx
+import pytest
+
+from api.src import service
+from api.src.ai_analyzer import unknown_profile
+
+URL = "https://acme.example/"
+
+
+def _profile(company_name):
+    return {
+        "company_name": company_name,
+        "service_lines": ["Widgets"],
+        "company_description": "Acme makes widgets.",
+        "tier1_keywords": ["widgets"],
+        "tier2_keywords": ["manufacturing"],
+        "emails": ["info@acme.example"],
+        "point_of_contact": ["Jane Doe"],
+    }
+
+
+@pytest.fixture
+def fake_site(monkeypatch):
+    requests = []
+    analyzed = []
+
+    def handler(request):
+        requests.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(
+            200,
+            headers={"Content-Type": "text/html; charset=utf-8", "ETag": '"v1"'},
+            text="<html><body><h1>Acme</h1><p>We make widgets.</p></body></html>",
+        )
+
+    async def fake_get_company_profile(html_content):
+        analyzed.append(html_content)
+        return _profile("Acme")
+
+    monkeypatch.setattr(
+        service, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    monkeypatch.setattr(service, "get_company_profile", fake_get_company_profile)
+    monkeypatch.setattr(service, "_profile_cache", OrderedDict())
+    return requests, analyzed
+
+
+def test_expired_profile_is_reused_when_site_answers_304(fake_site):
+    requests, analyzed = fake_site
+
+    async def analyze_twice():
+        first = await service.analyze_website(URL)
+        service._profile_cache[URL].expires_at = 0
+        second = await service.analyze_website(URL)
+        return first, second
+
+    first, second = asyncio.run(analyze_twice())
+
+    assert first == second == _profile("Acme")
+    assert len(requests) == 2
+    assert requests[1].headers["If-None-Match"] == '"v1"'
+    assert len(analyzed) == 1
+    assert service._profile_cache[URL].expires_at > 0
+
+
+def test_non_html_response_skips_analysis(monkeypatch):
+    def handler(request):
+        return httpx.Response(
+            200, headers={"Content-Type": "application/pdf"}, content=b"%PDF-1.7"
+        )
+
+    async def unexpected_get_company_profile(html_content):
+        raise AssertionError("get_company_profile should not be called")
+
+    monkeypatch.setattr(
+        service, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    monkeypatch.setattr(service, "get_company_profile", unexpected_get_company_profile)
+    monkeypatch.setattr(service, "_profile_cache", OrderedDict())
+
+    profile = asyncio.run(service.analyze_website("https://acme.example/brochure"))
+
+    assert profile == unknown_profile()
+    assert service._profile_cache == {}
+
+
+def test_idle_hosts_are_pruned(monkeypatch):
+    def handler(request):
+        return httpx.Response(200, headers={"Content-Type": "text/html"}, text="<p>Hi</p>")
+
+    monkeypatch.setattr(
+        service, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    monkeypatch.setattr(service, "_hosts", {})
+
+    async def fetch_many_hosts():
+        await service.fetch_website("https://a.example/")
+        await service.fetch_website("https://b.example/")
+        await asyncio.sleep(service.HOST_MIN_INTERVAL_SECONDS * 2)
+        await service.fetch_website("https://c.example/")
+
+    asyncio.run(fetch_many_hosts())
+
+    assert list(service._hosts) == ["c.example"]
+    assert service._hosts["c.example"].active_fetches == 0
+
+
+def test_304_after_eviction_reinserts_profile_with_new_validators(monkeypatch):
+    def handler(request):
+        if "If-None-Match" in request.headers:
+            # Simulate other requests evicting this URL while we fetch
+            service._profile_cache.clear()
+            return httpx.Response(304, headers={"ETag": '"v2"'})
+        return httpx.Response(
+            200,
+            headers={"Content-Type": "text/html", "ETag": '"v1"'},
+            text="<html><body><h1>Acme</h1></body></html>",
+        )
+
+    async def fake_get_company_profile(html_content):
+        return _profile("Acme")
+
+    monkeypatch.setattr(
+        service, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    monkeypatch.setattr(service, "get_company_profile", fake_get_company_profile)
+    monkeypatch.setattr(service, "_profile_cache", OrderedDict())
+
+    async def analyze_twice():
+        await service.analyze_website(URL)
+        service._profile_cache[URL].expires_at = 0
+        return await service.analyze_website(URL)
+
+    profile = asyncio.run(analyze_twice())
+
+    assert profile == _profile("Acme")
+    assert service._profile_cache[URL].etag == '"v2"'
+    assert service._profile_cache[URL].expires_at > 0